@@ -3,9 +3,11 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_restx import Api
 from config import Config
+from app.utils.rate_limit import RateLimiter
 
 db = SQLAlchemy()
 migrate = Migrate()
+limiter = RateLimiter()
 
 # Initialize the main API
 api = Api(
@@ -21,6 +23,7 @@ def create_app(config_class=Config):
 
     db.init_app(app)
     migrate.init_app(app, db)
+    limiter.init_app(app)
 
     # Initialize the main API with the app
     api.init_app(app)
@@ -29,10 +32,18 @@ def create_app(config_class=Config):
     from app.routes.auth import auth_bp
     from app.routes.property import property_bp
     from app.routes.user import user_bp
+    from app.routes.batch import batch_bp
+    from app.routes.monitoring import monitoring_bp
 
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(property_bp)
     app.register_blueprint(user_bp)
+    app.register_blueprint(batch_bp)
+    app.register_blueprint(monitoring_bp)
+
+    # Negotiated gzip/zstd compression for larger responses
+    from app.utils.helpers import compress_response
+    app.after_request(compress_response)
 
     return app
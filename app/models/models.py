@@ -18,11 +18,22 @@ class User(db.Model):
     role = db.Column(Enum(*ROLE_CHOICES, name='user_roles'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Case-insensitive prefix search; pattern ops let LIKE 'abc%' use the index
+    __table_args__ = (
+        db.Index('ix_users_username_lower', db.func.lower(username).label('username_lower'),
+                 postgresql_ops={'username_lower': 'text_pattern_ops'}),
+        db.Index('ix_users_email_lower', db.func.lower(email).label('email_lower'),
+                 postgresql_ops={'email_lower': 'text_pattern_ops'}),
+    )
+
     # Relationships
-    properties = db.relationship('Property', backref='broker', lazy=True)
-    likes = db.relationship('Like', backref='user', lazy=True)
-    comments = db.relationship('Comment', backref='user', lazy=True)
-    inquiries = db.relationship('Inquiry', backref='customer', lazy=True)
+    # Dependent rows are removed by ON DELETE CASCADE in the database;
+    # passive_deletes keeps the ORM from loading them just to delete them
+    properties = db.relationship('Property', backref='broker', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    likes = db.relationship('Like', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    comments = db.relationship('Comment', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    inquiries = db.relationship('Inquiry', backref='customer', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    saved_searches = db.relationship('SavedSearch', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -45,15 +56,16 @@ class Property(db.Model):
     bedrooms = db.Column(db.Integer, nullable=False)
     bathrooms = db.Column(db.Integer, nullable=False)
     square_feet = db.Column(db.Integer, nullable=True)
-    broker_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    broker_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
-    photos = db.relationship('PropertyPhoto', backref='property', lazy=True, cascade='all, delete-orphan')
-    inquiries = db.relationship('Inquiry', backref='property', lazy=True, cascade='all, delete-orphan')
-    statuses = db.relationship('PropertyStatus', backref='property', lazy=True, cascade='all, delete-orphan')
-    likes = db.relationship('Like', backref='property', lazy=True, cascade='all, delete-orphan')
-    comments = db.relationship('Comment', backref='property', lazy=True, cascade='all, delete-orphan')
+    photos = db.relationship('PropertyPhoto', backref='property', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    inquiries = db.relationship('Inquiry', backref='property', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    statuses = db.relationship('PropertyStatus', backref='property', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    likes = db.relationship('Like', backref='property', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    comments = db.relationship('Comment', backref='property', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    search_alerts = db.relationship('SearchAlert', backref='property', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return f'<Property {self.title}>'
@@ -63,7 +75,7 @@ class PropertyPhoto(db.Model):
     __tablename__ = 'property_photos'
 
     id = db.Column(db.Integer, primary_key=True)
-    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), nullable=False, index=True)
     photo_url = db.Column(db.Text, nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -75,8 +87,8 @@ class Inquiry(db.Model):
     __tablename__ = 'inquiries'
 
     id = db.Column(db.Integer, primary_key=True)
-    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
-    customer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), nullable=False, index=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -90,7 +102,7 @@ class PropertyStatus(db.Model):
     STATUS_CHOICES = ['available', 'rented', 'pending']
 
     id = db.Column(db.Integer, primary_key=True)
-    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), nullable=False, index=True)
     status = db.Column(Enum(*STATUS_CHOICES, name='status_types'), nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -108,8 +120,8 @@ class Like(db.Model):
     __tablename__ = 'likes'
 
     id = db.Column(db.Integer, primary_key=True)
-    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Ensure a user can only like a property once
@@ -125,8 +137,8 @@ class Comment(db.Model):
     __tablename__ = 'comments'
 
     id = db.Column(db.Integer, primary_key=True)
-    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -138,4 +150,49 @@ class Comment(db.Model):
         return value
 
     def __repr__(self):
-        return f'<Comment {self.id} by User {self.user_id}>'
\ No newline at end of file
+        return f'<Comment {self.id} by User {self.user_id}>'
+
+
+class SavedSearch(db.Model):
+    __tablename__ = 'saved_searches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=True)
+    # Every criterion is optional; a missing one matches any listing
+    city = db.Column(db.String(100), nullable=True)
+    property_type = db.Column(db.String(20), nullable=True)
+    min_price = db.Column(db.Numeric(10, 2), nullable=True)
+    max_price = db.Column(db.Numeric(10, 2), nullable=True)
+    min_bedrooms = db.Column(db.Integer, nullable=True)
+    max_bedrooms = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    alerts = db.relationship('SearchAlert', backref='saved_search', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+
+    @validates('property_type')
+    def validate_property_type(self, key, value):
+        if value is not None and value not in Property.PROPERTY_TYPE_CHOICES:
+            raise ValueError(f'Invalid property type. Must be one of: {", ".join(Property.PROPERTY_TYPE_CHOICES)}')
+        return value
+
+    def __repr__(self):
+        return f'<SavedSearch {self.id} for User {self.user_id}>'
+
+
+class SearchAlert(db.Model):
+    __tablename__ = 'search_alerts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    saved_search_id = db.Column(db.Integer, db.ForeignKey('saved_searches.id', ondelete='CASCADE'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Alert a saved search about a given property only once
+    __table_args__ = (
+        UniqueConstraint('saved_search_id', 'property_id', name='unique_search_property_alert'),
+    )
+
+    def __repr__(self):
+        return f'<SearchAlert for SavedSearch {self.saved_search_id} on Property {self.property_id}>'
@@ -9,28 +9,34 @@ from datetime import datetime, timedelta
 from flask import current_app
 from functools import wraps
 
+def get_token_user_id():
+    """Return the user id carried by the request's bearer token, if valid."""
+    token = request.headers.get('Authorization')
+    if not token:
+        return None
+    try:
+        token = token.split()[1]  # Remove 'Bearer ' prefix
+        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+        return data['user_id']
+    except (IndexError, KeyError, jwt.InvalidTokenError):
+        return None
+
 def token_required(f):
     @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return f(None, *args, **kwargs)  # Allow access without token
-        try:
-            token = token.split()[1]  # Remove 'Bearer ' prefix
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.query.get(data['user_id'])
-            return f(current_user, *args, **kwargs)
-        except:
-            return f(None, *args, **kwargs)  # Allow access if token is invalid
+    def decorated(self, *args, **kwargs):
+        # Allow access without a token or with an invalid one
+        user_id = get_token_user_id()
+        current_user = User.query.get(user_id) if user_id is not None else None
+        return f(self, current_user, *args, **kwargs)
     return decorated
 
 def role_required(roles):
     def decorator(f):
         @wraps(f)
-        def decorated_function(current_user, *args, **kwargs):
+        def decorated_function(self, current_user, *args, **kwargs):
             if not current_user or current_user.role not in roles:
                 return {'message': 'Unauthorized access'}, 403
-            return f(current_user, *args, **kwargs)
+            return f(self, current_user, *args, **kwargs)
         return decorated_function
     return decorator
 
@@ -93,7 +99,7 @@ class Register(Resource):
         )
         db.session.add(user)
         db.session.commit()
-        return UserSchema(exclude=['password_hash']).dump(user), 201
+        return UserSchema().dump(user), 201
 
 @auth_ns.route('/login')
 class Login(Resource):
@@ -117,7 +123,7 @@ class Login(Resource):
             )
             return {
                 'token': token,
-                'user': UserSchema(exclude=['password_hash']).dump(user)
+                'user': UserSchema().dump(user)
             }
         
         return {'message': 'Invalid credentials'}, 401
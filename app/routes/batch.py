@@ -0,0 +1,173 @@
+from contextlib import contextmanager
+from time import perf_counter
+
+from flask import Blueprint, request, current_app
+from flask_restx import Resource, fields
+from app import db, api
+from app.routes.auth import auth_ns
+from app.routes.property import property_ns
+from app.routes.user import user_ns
+
+batch_bp = Blueprint('batch', __name__, url_prefix='/api')
+batch_ns = api.namespace(
+    'batch',
+    description='Run several API calls in one HTTP round trip'
+)
+
+BATCH_NAMESPACES = (auth_ns, property_ns, user_ns)
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+# API Models for documentation
+sub_request_model = batch_ns.model('SubRequest', {
+    'id': fields.String(description='Client-chosen identifier echoed in the response', example='card-1'),
+    'method': fields.String(required=True, description='HTTP method', enum=list(BATCH_METHODS), example='GET'),
+    'path': fields.String(required=True, description='API path, including any query string', example='/property/properties/1?fields=id,title'),
+    'body': fields.Raw(description='JSON body for POST/PUT requests')
+})
+
+batch_model = batch_ns.model('Batch', {
+    'requests': fields.List(fields.Nested(sub_request_model), required=True),
+    'atomic': fields.Boolean(description='Commit all writes together, or none if any sub-request fails', default=False)
+})
+
+sub_response_model = batch_ns.model('SubResponse', {
+    'id': fields.String(description='Identifier from the sub-request'),
+    'status': fields.Integer(description='HTTP status of the sub-request', example=200),
+    'body': fields.Raw(description='JSON (or text) body of the sub-request'),
+    'duration_ms': fields.Float(description='Time spent handling the sub-request', example=3.2)
+})
+
+batch_response_model = batch_ns.model('BatchResponse', {
+    'responses': fields.List(fields.Nested(sub_response_model)),
+    'committed': fields.Boolean(description='Whether an atomic batch was committed (atomic batches only)')
+})
+
+
+@contextmanager
+def _deferred_commits(session):
+    """Turn view-level commits into flushes for the duration of a batch.
+
+    Writes stay visible to later sub-requests through the shared session,
+    and callbacks registered with ``after_commit`` wait for the real commit.
+    """
+    session.info['after_commit'] = []
+    session.commit = session.flush
+    try:
+        yield session.info['after_commit']
+    finally:
+        del session.commit
+        del session.info['after_commit']
+
+
+def _dispatch(app, sub_request, headers, remote_addr):
+    with app.test_request_context(
+        sub_request['path'],
+        method=sub_request['method'],
+        json=sub_request.get('body'),
+        headers=headers,
+        environ_base={'REMOTE_ADDR': remote_addr}
+    ):
+        try:
+            # Runs before_request hooks, so rate limits apply per sub-request
+            rv = app.preprocess_request()
+            if rv is None and request.routing_exception is not None:
+                # Flask renders unmatched routes as HTML; keep batch bodies JSON
+                error = request.routing_exception
+                rv = {'message': error.description}, error.code
+            if rv is None:
+                rv = app.dispatch_request()
+        except Exception as e:
+            try:
+                rv = app.handle_user_exception(e)
+            except Exception:
+                current_app.logger.exception('Unhandled error in batch sub-request')
+                rv = {'message': 'Internal Server Error'}, 500
+        return app.make_response(rv)
+
+
+def _validate(sub_request):
+    if not isinstance(sub_request, dict):
+        return 'Each sub-request must be an object'
+    method = str(sub_request.get('method', '')).upper()
+    path = sub_request.get('path')
+    if method not in BATCH_METHODS:
+        return f'Method must be one of: {", ".join(BATCH_METHODS)}'
+    if not isinstance(path, str) or not any(
+        path == ns.path or path.startswith(ns.path + '/') for ns in BATCH_NAMESPACES
+    ):
+        return f'Path must start with one of: {", ".join(ns.path for ns in BATCH_NAMESPACES)}'
+    sub_request['method'] = method
+    return None
+
+
+@batch_ns.route('')
+class Batch(Resource):
+    @batch_ns.doc('run_batch')
+    @batch_ns.expect(batch_model)
+    @batch_ns.response(200, 'Batch processed', batch_response_model)
+    @batch_ns.response(400, 'Validation error')
+    def post(self):
+        """Run several sub-requests in-process, sharing the caller's credentials and DB session"""
+        data = request.get_json() or {}
+        sub_requests = data.get('requests')
+        max_requests = current_app.config.get('BATCH_MAX_REQUESTS', 50)
+        if not isinstance(sub_requests, list) or not sub_requests:
+            return {'message': 'Expected a non-empty list under "requests"'}, 400
+        if len(sub_requests) > max_requests:
+            return {'message': f'A batch may contain at most {max_requests} requests'}, 400
+        errors = {index: error for index, error in enumerate(map(_validate, sub_requests)) if error}
+        if errors:
+            return {'message': errors}, 400
+
+        app = current_app._get_current_object()
+        # Sub-requests act as the same principal (and client, for rate limits)
+        headers = {
+            name: request.headers[name]
+            for name in ('Authorization', 'X-Forwarded-For') if name in request.headers
+        }
+        remote_addr = request.remote_addr
+        atomic = bool(data.get('atomic'))
+        responses = []
+
+        def run(sub_request):
+            started = perf_counter()
+            response = _dispatch(app, sub_request, headers, remote_addr)
+            body = response.get_json(silent=True)
+            if body is None and response.status_code != 204:
+                body = response.get_data(as_text=True) or None
+            responses.append({
+                'id': sub_request.get('id'),
+                'status': response.status_code,
+                'body': body,
+                'duration_ms': round((perf_counter() - started) * 1000, 3)
+            })
+            return response.status_code < 400
+
+        if not atomic:
+            for sub_request in sub_requests:
+                if not run(sub_request):
+                    db.session.rollback()  # Don't leak a failed sub-request's pending state
+            return {'responses': responses}
+
+        session = db.session()
+        with _deferred_commits(session) as callbacks:
+            try:
+                ok = all(run(sub_request) for sub_request in sub_requests)
+            except Exception:
+                session.rollback()
+                raise
+        if ok:
+            session.commit()
+            for callback in callbacks:
+                callback()
+        else:
+            session.rollback()
+            # Report the sub-requests that never ran
+            for sub_request in sub_requests[len(responses):]:
+                responses.append({
+                    'id': sub_request.get('id'),
+                    'status': 424,
+                    'body': {'message': 'Skipped because an earlier sub-request failed'},
+                    'duration_ms': 0.0
+                })
+        return {'responses': responses, 'committed': ok}
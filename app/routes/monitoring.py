@@ -0,0 +1,29 @@
+from flask import Blueprint, current_app
+from flask_restx import Resource, fields
+from app import api
+from app.routes.auth import token_required, role_required
+
+monitoring_bp = Blueprint('monitoring', __name__, url_prefix='/api')
+monitoring_ns = api.namespace(
+    'monitoring',
+    description='Operational metrics for RentApp'
+)
+
+# API Models for documentation
+limits_model = monitoring_ns.model('RateLimitStats', {
+    'in_flight': fields.Integer(description='Requests currently being handled by this process', example=12),
+    'queued': fields.Integer(description='Requests waiting for an admission slot', example=0),
+    'max_in_flight': fields.Integer(description='Concurrency cap for this process', example=64),
+    'counters': fields.Raw(description='Allowed/limited counts per scope and shed counts', example={'allowed.default': 120, 'limited.auth_login': 3})
+})
+
+@monitoring_ns.route('/limits')
+class Limits(Resource):
+    @monitoring_ns.doc('get_limit_stats', security='Bearer Auth')
+    @monitoring_ns.response(200, 'Success', limits_model)
+    @monitoring_ns.response(403, 'Forbidden - Admin access required')
+    @token_required
+    @role_required(['admin'])
+    def get(self, current_user):
+        """Rate limiting and admission control counters (Admin only)"""
+        return current_app.extensions['rate_limiter'].stats()
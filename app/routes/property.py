@@ -7,6 +7,9 @@ from app.schemas.schemas import (
     InquirySchema, LikeSchema, CommentSchema
 )
 from app.routes.auth import token_required, role_required
+from app.services.property_service import attach_cover_photos
+from app.services.saved_search_service import notify_matching_searches
+from app.utils.helpers import sparse_fields, with_fields
 
 property_bp = Blueprint('property', __name__, url_prefix='/api')
 property_ns = api.namespace(
@@ -29,7 +32,8 @@ property_model = property_ns.model('Property', {
     'bathrooms': fields.Integer(required=True, description='Number of bathrooms', example=2),
     'square_feet': fields.Integer(description='Square footage', example=1200),
     'broker_id': fields.Integer(required=True, description='Broker ID', example=1),
-    'created_at': fields.DateTime(readonly=True, description='Creation date', example='2025-01-01T00:00:00Z')
+    'created_at': fields.DateTime(readonly=True, description='Creation date', example='2025-01-01T00:00:00Z'),
+    'cover_photo': fields.String(readonly=True, description='URL of the first photo; only returned when requested with fields=', example='https://example.com/1.jpg')
 })
 
 property_status_model = property_ns.model('PropertyStatus', {
@@ -54,14 +58,22 @@ comment_model = property_ns.model('Comment', {
     'content': fields.String(required=True, description='Comment content')
 })
 
+fields_parser = property_ns.parser()
+fields_parser.add_argument('fields', type=str, location='args',
+                           help='Comma-separated list of fields to return, e.g. id,title,price,city,cover_photo')
+
 @property_ns.route('/properties')
 class Properties(Resource):
     @property_ns.doc('list_properties')
+    @property_ns.expect(fields_parser)
     @property_ns.response(200, 'Success')
     def get(self):
         """List all properties"""
-        properties = Property.query.all()
-        return PropertySchema(many=True).dump(properties)
+        only = sparse_fields(PropertySchema)
+        properties = with_fields(Property.query, Property, only).all()
+        if only and 'cover_photo' in only:
+            attach_cover_photos(properties)
+        return PropertySchema(many=True, only=only).dump(properties)
 
     @property_ns.doc('create_property')
     @property_ns.expect(property_model)
@@ -87,17 +99,22 @@ class Properties(Resource):
         )
         db.session.add(property)
         db.session.commit()
+        notify_matching_searches([property])
         return PropertySchema().dump(property), 201
 
 @property_ns.route('/properties/<int:property_id>')
 class PropertyResource(Resource):
     @property_ns.doc('get_property')
+    @property_ns.expect(fields_parser)
     @property_ns.response(200, 'Success')
     @property_ns.response(404, 'Property not found')
     def get(self, property_id):
         """Get a specific property"""
-        property = Property.query.get_or_404(property_id)
-        return PropertySchema().dump(property)
+        only = sparse_fields(PropertySchema)
+        property = with_fields(Property.query, Property, only).get_or_404(property_id)
+        if only and 'cover_photo' in only:
+            attach_cover_photos([property])
+        return PropertySchema(only=only).dump(property)
 
     @property_ns.doc('update_property')
     @property_ns.expect(property_model)
@@ -136,11 +153,13 @@ class PropertyResource(Resource):
 @property_ns.route('/properties/<int:property_id>/inquiries')
 class PropertyInquiries(Resource):
     @property_ns.doc('get_property_inquiries')
+    @property_ns.expect(fields_parser)
     @property_ns.response(200, 'Success')
     def get(self, property_id):
         """Get all inquiries for a property"""
-        inquiries = Inquiry.query.filter_by(property_id=property_id).all()
-        return InquirySchema(many=True).dump(inquiries)
+        only = sparse_fields(InquirySchema)
+        inquiries = with_fields(Inquiry.query, Inquiry, only).filter_by(property_id=property_id).all()
+        return InquirySchema(many=True, only=only).dump(inquiries)
 
     @property_ns.doc('create_property_inquiry')
     @property_ns.expect(inquiry_model)
@@ -160,11 +179,13 @@ class PropertyInquiries(Resource):
 @property_ns.route('/properties/<int:property_id>/likes')
 class PropertyLikes(Resource):
     @property_ns.doc('get_property_likes')
+    @property_ns.expect(fields_parser)
     @property_ns.response(200, 'Success')
     def get(self, property_id):
         """Get all likes for a property"""
-        likes = Like.query.filter_by(property_id=property_id).all()
-        return LikeSchema(many=True).dump(likes)
+        only = sparse_fields(LikeSchema)
+        likes = with_fields(Like.query, Like, only).filter_by(property_id=property_id).all()
+        return LikeSchema(many=True, only=only).dump(likes)
 
     @property_ns.doc('create_property_like')
     @property_ns.expect(like_model)
@@ -190,13 +211,15 @@ class PropertyLikes(Resource):
         return LikeSchema().dump(like), 201
 
 @property_ns.route('/properties/<int:property_id>/status')
-class PropertyStatus(Resource):
+class PropertyStatusResource(Resource):
     @property_ns.doc('get_property_status')
+    @property_ns.expect(fields_parser)
     @property_ns.response(200, 'Success')
     def get(self, property_id):
         """Get property status"""
-        status = PropertyStatus.query.filter_by(property_id=property_id).first()
-        return PropertyStatusSchema().dump(status)
+        only = sparse_fields(PropertyStatusSchema)
+        status = with_fields(PropertyStatus.query, PropertyStatus, only).filter_by(property_id=property_id).first()
+        return PropertyStatusSchema(only=only).dump(status)
 
     @property_ns.doc('update_property_status')
     @property_ns.expect(property_status_model)
@@ -215,18 +238,23 @@ class PropertyStatus(Resource):
             status = PropertyStatus(property_id=property_id)
             db.session.add(status)
         
+        became_available = status.status != 'available' and data['status'] == 'available'
         status.status = data['status']
         db.session.commit()
+        if became_available:
+            notify_matching_searches([property])
         return PropertyStatusSchema().dump(status)
 
 @property_ns.route('/properties/<int:property_id>/photos')
 class PropertyPhotos(Resource):
     @property_ns.doc('get_property_photos')
+    @property_ns.expect(fields_parser)
     @property_ns.response(200, 'Success')
     def get(self, property_id):
         """Get all photos for a property"""
-        photos = PropertyPhoto.query.filter_by(property_id=property_id).all()
-        return PropertyPhotoSchema(many=True).dump(photos)
+        only = sparse_fields(PropertyPhotoSchema)
+        photos = with_fields(PropertyPhoto.query, PropertyPhoto, only).filter_by(property_id=property_id).all()
+        return PropertyPhotoSchema(many=True, only=only).dump(photos)
 
     @property_ns.doc('add_property_photo')
     @property_ns.expect(property_photo_model)
@@ -272,11 +300,13 @@ class PropertyPhotoResource(Resource):
 @property_ns.route('/properties/<int:property_id>/comments')
 class PropertyComments(Resource):
     @property_ns.doc('get_property_comments')
+    @property_ns.expect(fields_parser)
     @property_ns.response(200, 'Success')
     def get(self, property_id):
         """Get all comments for a property"""
-        comments = Comment.query.filter_by(property_id=property_id).all()
-        return CommentSchema(many=True).dump(comments)
+        only = sparse_fields(CommentSchema)
+        comments = with_fields(Comment.query, Comment, only).filter_by(property_id=property_id).all()
+        return CommentSchema(many=True, only=only).dump(comments)
 
     @property_ns.doc('create_property_comment')
     @property_ns.expect(comment_model)
@@ -1,9 +1,15 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app
 from flask_restx import Resource, fields
 from app import db, api
-from app.models.models import User
-from app.schemas.schemas import UserSchema
+from marshmallow import ValidationError
+from sqlalchemy import func, or_
+from app.models.models import User, SavedSearch, SearchAlert
+from app.schemas.schemas import UserSchema, SavedSearchSchema, SearchAlertSchema
 from app.routes.auth import token_required, role_required
+from app.services.saved_search_service import saved_search_index
+from app.services.user_service import search_users, import_users, delete_user
+from app.utils.helpers import sparse_fields, with_fields, after_commit
+from werkzeug.security import generate_password_hash
 
 user_bp = Blueprint('user', __name__, url_prefix='/api')
 user_ns = api.namespace(
@@ -30,23 +36,66 @@ success_model = user_ns.model('Success', {
 })
 
 user_list_model = user_ns.model('UserList', {
-    'users': fields.List(fields.Nested(user_model))
+    'users': fields.List(fields.Nested(user_model)),
+    'next_cursor': fields.Integer(description='Pass as `after` to fetch the next page; null on the last page', example=50)
+})
+
+user_create_model = user_ns.inherit('UserCreate', user_model, {
+    'password': fields.String(required=True, description='Password (minimum 6 characters)', min_length=6)
+})
+
+user_import_model = user_ns.model('UserImport', {
+    'users': fields.List(fields.Nested(user_create_model), required=True)
+})
+
+user_import_result_model = user_ns.model('UserImportResult', {
+    'created': fields.Integer(description='Number of users created', example=998),
+    'skipped': fields.List(fields.Raw, description='Index and reason of each record that was not imported')
+})
+
+fields_parser = user_ns.parser()
+fields_parser.add_argument('fields', type=str, location='args',
+                           help='Comma-separated list of fields to return, e.g. id,username,email')
+
+directory_parser = fields_parser.copy()
+directory_parser.add_argument('q', type=str, location='args', help='Case-insensitive username/email prefix')
+directory_parser.add_argument('role', type=str, location='args', choices=User.ROLE_CHOICES, help='Filter by role')
+directory_parser.add_argument('after', type=int, location='args', help='Cursor returned by the previous page')
+directory_parser.add_argument('limit', type=int, location='args', default=50, help='Page size (max 200)')
+
+saved_search_model = user_ns.model('SavedSearch', {
+    'id': fields.Integer(readonly=True, description='Saved search ID', example=1),
+    'name': fields.String(description='Label for the saved search', example='Downtown 2BR'),
+    'city': fields.String(description='City to match (any city if omitted)', example='New York'),
+    'property_type': fields.String(description='Type of property (any type if omitted)', enum=['apartment', 'house'], example='apartment'),
+    'min_price': fields.Float(description='Minimum price', example=1000.0),
+    'max_price': fields.Float(description='Maximum price', example=2500.0),
+    'min_bedrooms': fields.Integer(description='Minimum number of bedrooms', example=2),
+    'max_bedrooms': fields.Integer(description='Maximum number of bedrooms', example=3),
+    'created_at': fields.DateTime(readonly=True, description='Creation date', example='2025-01-01T00:00:00Z')
 })
 
 @user_ns.route('/users')
 class Users(Resource):
     @user_ns.doc('list_users',
-             description='List all users (Admin only)',
+             description='Browse the user directory with prefix search and keyset pagination (Admin only)',
              security='Bearer Auth',
              responses={
                  200: ('Success', user_list_model),
                  403: ('Forbidden - Admin access required', error_model)
              })
+    @user_ns.expect(directory_parser)
     @token_required
     @role_required(['admin'])
     def get(self, current_user):
-        users = User.query.all()
-        return UserSchema(many=True, exclude=['password_hash']).dump(users)
+        args = directory_parser.parse_args()
+        limit = min(max(args['limit'] or 50, 1), 200)
+        only = sparse_fields(UserSchema)
+        users, next_cursor = search_users(args['q'], args['role'], args['after'], limit, only)
+        return {
+            'users': UserSchema(many=True, only=only).dump(users),
+            'next_cursor': next_cursor
+        }
 
     @user_ns.doc('create_user',
              description='Create a new user account (Admin only)',
@@ -57,22 +106,54 @@ class Users(Resource):
                  403: ('Forbidden - Admin access required', error_model),
                  409: ('Conflict - email/username already exists', error_model)
              })
-    @user_ns.expect(user_model)
+    @user_ns.expect(user_create_model)
     @token_required
     @role_required(['admin'])
     def post(self, current_user):
-        data = request.get_json()
-        if User.query.filter_by(email=data['email']).first():
-            return {'message': 'Email already registered'}, 400
-        
+        try:
+            data = UserSchema().load(request.get_json())
+        except ValidationError as err:
+            return {'message': err.messages}, 400
+        if User.query.filter(or_(
+            func.lower(User.email) == data['email'].lower(),
+            func.lower(User.username) == data['username'].lower()
+        )).first():
+            return {'message': 'Username or email already registered'}, 409
+
+        data['password_hash'] = generate_password_hash(data.pop('password'))
         user = User(**data)
         db.session.add(user)
         db.session.commit()
-        return UserSchema(exclude=['password_hash']).dump(user), 201
+        return UserSchema().dump(user), 201
+
+@user_ns.route('/users/import')
+class UserImport(Resource):
+    @user_ns.doc('import_users',
+             description='Bulk import users, hashing passwords in parallel and inserting in batches (Admin only)',
+             security='Bearer Auth',
+             responses={
+                 201: ('Import finished', user_import_result_model),
+                 400: ('Validation error', error_model),
+                 403: ('Forbidden - Admin access required', error_model),
+                 413: ('Too many users in one import', error_model)
+             })
+    @user_ns.expect(user_import_model)
+    @token_required
+    @role_required(['admin'])
+    def post(self, current_user):
+        data = request.get_json() or {}
+        if not isinstance(data.get('users'), list):
+            return {'message': 'Expected a list of users under "users"'}, 400
+        max_records = current_app.config.get('USER_IMPORT_MAX_RECORDS', 200)
+        if len(data['users']) > max_records:
+            return {'message': f'An import may contain at most {max_records} users; split it into several requests'}, 413
+        created, skipped = import_users(data['users'])
+        return {'created': created, 'skipped': skipped}, 201
 
 @user_ns.route('/users/<int:user_id>')
 class UserResource(Resource):
     @user_ns.doc('get_user')
+    @user_ns.expect(fields_parser)
     @user_ns.response(200, 'Success')
     @user_ns.response(404, 'User not found')
     @token_required
@@ -80,8 +161,9 @@ class UserResource(Resource):
         """Get a specific user"""
         if current_user.id != user_id and current_user.role != 'admin':
             return {'message': 'Unauthorized'}, 403
-        user = User.query.get_or_404(user_id)
-        return UserSchema(exclude=['password_hash']).dump(user)
+        only = sparse_fields(UserSchema)
+        user = with_fields(User.query, User, only).get_or_404(user_id)
+        return UserSchema(only=only).dump(user)
 
     @user_ns.doc('update_user')
     @user_ns.expect(user_model)
@@ -100,16 +182,90 @@ class UserResource(Resource):
                 setattr(user, key, value)
             
         db.session.commit()
-        return UserSchema(exclude=['password_hash']).dump(user)
+        return UserSchema().dump(user)
 
     @user_ns.doc('delete_user')
     @user_ns.response(204, 'User deleted')
+    @user_ns.response(202, 'User has many listings; deletion scheduled in the background')
     @user_ns.response(404, 'User not found')
     @token_required
     @role_required(['admin'])
     def delete(self, current_user, user_id):
         """Delete a user (Admin only)"""
         user = User.query.get_or_404(user_id)
-        db.session.delete(user)
+        if not delete_user(user):
+            return {'message': 'User deletion scheduled'}, 202
+        return '', 204
+
+@user_ns.route('/users/<int:user_id>/saved-searches')
+class UserSavedSearches(Resource):
+    @user_ns.doc('list_saved_searches')
+    @user_ns.expect(fields_parser)
+    @user_ns.response(200, 'Success')
+    @token_required
+    def get(self, current_user, user_id):
+        """List a user's saved searches"""
+        if not current_user or (current_user.id != user_id and current_user.role != 'admin'):
+            return {'message': 'Unauthorized'}, 403
+        only = sparse_fields(SavedSearchSchema)
+        searches = with_fields(SavedSearch.query, SavedSearch, only).filter_by(user_id=user_id).all()
+        return SavedSearchSchema(many=True, only=only).dump(searches)
+
+    @user_ns.doc('create_saved_search')
+    @user_ns.expect(saved_search_model)
+    @user_ns.response(201, 'Saved search created')
+    @user_ns.response(400, 'Validation error')
+    @token_required
+    def post(self, current_user, user_id):
+        """Save a search and get alerted on matching listings"""
+        if not current_user or (current_user.id != user_id and current_user.role != 'admin'):
+            return {'message': 'Unauthorized'}, 403
+        try:
+            data = SavedSearchSchema().load(request.get_json())
+        except ValidationError as err:
+            return {'message': err.messages}, 400
+
+        search = SavedSearch(user_id=user_id, **data)
+        db.session.add(search)
+        db.session.commit()
+        after_commit(lambda: saved_search_index.add(search))
+        return SavedSearchSchema().dump(search), 201
+
+@user_ns.route('/users/<int:user_id>/saved-searches/<int:search_id>')
+class UserSavedSearchResource(Resource):
+    @user_ns.doc('delete_saved_search')
+    @user_ns.response(204, 'Saved search deleted')
+    @user_ns.response(404, 'Saved search not found')
+    @token_required
+    def delete(self, current_user, user_id, search_id):
+        """Delete a saved search"""
+        if not current_user or (current_user.id != user_id and current_user.role != 'admin'):
+            return {'message': 'Unauthorized'}, 403
+        search = SavedSearch.query.get_or_404(search_id)
+        if search.user_id != user_id:
+            return {'message': 'Saved search not found'}, 404
+
+        db.session.delete(search)
         db.session.commit()
+        after_commit(lambda: saved_search_index.remove(search_id))
         return '', 204
+
+@user_ns.route('/users/<int:user_id>/alerts')
+class UserSearchAlerts(Resource):
+    @user_ns.doc('list_search_alerts')
+    @user_ns.expect(fields_parser)
+    @user_ns.response(200, 'Success')
+    @token_required
+    def get(self, current_user, user_id):
+        """List listings that matched a user's saved searches"""
+        if not current_user or (current_user.id != user_id and current_user.role != 'admin'):
+            return {'message': 'Unauthorized'}, 403
+        only = sparse_fields(SearchAlertSchema)
+        alerts = (
+            with_fields(SearchAlert.query, SearchAlert, only)
+            .join(SavedSearch)
+            .filter(SavedSearch.user_id == user_id)
+            .order_by(SearchAlert.created_at.desc())
+            .all()
+        )
+        return SearchAlertSchema(many=True, only=only).dump(alerts)
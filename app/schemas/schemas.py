@@ -1,5 +1,7 @@
-from marshmallow import Schema, fields, validate, validates, ValidationError
-from app.models.models import User, Property, PropertyPhoto, PropertyStatus, Inquiry, Like, Comment
+from marshmallow import Schema, fields, validate, validates, validates_schema, ValidationError
+from app.models.models import (
+    User, Property, PropertyPhoto, PropertyStatus, Inquiry, Like, Comment, SavedSearch, SearchAlert
+)
 from datetime import datetime
 
 class UserSchema(Schema):
@@ -12,7 +14,7 @@ class UserSchema(Schema):
     created_at = fields.DateTime(dump_only=True)
 
     @validates('phone_number')
-    def validate_phone_number(self, value):
+    def validate_phone_number(self, value, **kwargs):
         if value and not value.isdigit():
             raise ValidationError('Phone number must contain only digits')
 
@@ -31,6 +33,8 @@ class PropertySchema(Schema):
     square_feet = fields.Int()
     broker_id = fields.Int(required=True)
     created_at = fields.DateTime(dump_only=True)
+    # Only filled in (with one extra query) when named in ``fields=``
+    cover_photo = fields.Str(dump_only=True, allow_none=True)
 
 class PropertyPhotoSchema(Schema):
     id = fields.Int(dump_only=True)
@@ -64,3 +68,30 @@ class CommentSchema(Schema):
     content = fields.Str(required=True, validate=validate.Length(min=1, max=1000))
     created_at = fields.DateTime(dump_only=True)
     updated_at = fields.DateTime(dump_only=True)
+
+class SavedSearchSchema(Schema):
+    id = fields.Int(dump_only=True)
+    user_id = fields.Int(dump_only=True)
+    name = fields.Str(validate=validate.Length(max=100), allow_none=True)
+    city = fields.Str(validate=validate.Length(max=100), allow_none=True)
+    property_type = fields.Str(validate=validate.OneOf(Property.PROPERTY_TYPE_CHOICES), allow_none=True)
+    min_price = fields.Decimal(places=2, allow_none=True)
+    max_price = fields.Decimal(places=2, allow_none=True)
+    min_bedrooms = fields.Int(validate=validate.Range(min=0), allow_none=True)
+    max_bedrooms = fields.Int(validate=validate.Range(min=0), allow_none=True)
+    created_at = fields.DateTime(dump_only=True)
+
+    @validates_schema
+    def validate_ranges(self, data, **kwargs):
+        if data.get('min_price') is not None and data.get('max_price') is not None \
+                and data['min_price'] > data['max_price']:
+            raise ValidationError('min_price cannot exceed max_price', 'min_price')
+        if data.get('min_bedrooms') is not None and data.get('max_bedrooms') is not None \
+                and data['min_bedrooms'] > data['max_bedrooms']:
+            raise ValidationError('min_bedrooms cannot exceed max_bedrooms', 'min_bedrooms')
+
+class SearchAlertSchema(Schema):
+    id = fields.Int(dump_only=True)
+    saved_search_id = fields.Int(dump_only=True)
+    property_id = fields.Int(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
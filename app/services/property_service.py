@@ -0,0 +1,25 @@
+from sqlalchemy import func
+
+from app import db
+from app.models.models import PropertyPhoto
+
+
+def attach_cover_photos(properties):
+    """Set ``cover_photo`` on each property to the URL of its first photo.
+
+    Costs one query for the whole list, so listing cards can show a photo
+    without loading every property's photo collection.
+    """
+    ids = [property.id for property in properties]
+    if not ids:
+        return properties
+    first_photos = db.session.query(func.min(PropertyPhoto.id)) \
+        .filter(PropertyPhoto.property_id.in_(ids)) \
+        .group_by(PropertyPhoto.property_id)
+    urls = dict(
+        db.session.query(PropertyPhoto.property_id, PropertyPhoto.photo_url)
+        .filter(PropertyPhoto.id.in_(first_photos.scalar_subquery()))
+    )
+    for property in properties:
+        property.cover_photo = urls.get(property.id)
+    return properties
@@ -0,0 +1,309 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock
+from time import monotonic
+import logging
+
+from flask import current_app
+
+from app import db
+from app.models.models import SavedSearch, SearchAlert
+from app.utils.helpers import after_commit
+
+logger = logging.getLogger(__name__)
+
+_NEG_INF = float('-inf')
+_POS_INF = float('inf')
+
+
+def _bound(value, default):
+    return default if value is None else float(value)
+
+
+class _IntervalNode:
+    __slots__ = ('center', 'by_low', 'by_high', 'left', 'right')
+
+    def __init__(self, center, by_low, by_high, left, right):
+        self.center = center
+        self.by_low = by_low
+        self.by_high = by_high
+        self.left = left
+        self.right = right
+
+
+class IntervalTree:
+    """Static centered interval tree answering "which ranges contain x".
+
+    Built once from ``(low, high, key)`` triples in O(n log n); a stabbing
+    query costs O(log n + k) where k is the number of ranges returned.
+    """
+
+    def __init__(self, intervals):
+        self.root = self._build(sorted(intervals, key=lambda i: i[0]))
+
+    @classmethod
+    def _build(cls, by_low):
+        # ``by_low`` stays sorted by low bound all the way down, so each level
+        # is a linear pass. Centering on the median low bound guarantees the
+        # node keeps at least one interval and each side gets at most half.
+        if not by_low:
+            return None
+        center = by_low[len(by_low) // 2][0]
+        left, right, overlapping = [], [], []
+        for interval in by_low:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                overlapping.append(interval)
+        return _IntervalNode(
+            center,
+            overlapping,
+            sorted(overlapping, key=lambda i: i[1], reverse=True),
+            cls._build(left),
+            cls._build(right),
+        )
+
+    def stab(self, x):
+        found = set()
+        node = self.root
+        while node is not None:
+            if x < node.center:
+                for low, _, key in node.by_low:
+                    if low > x:
+                        break
+                    found.add(key)
+                node = node.left
+            elif x > node.center:
+                for _, high, key in node.by_high:
+                    if high < x:
+                        break
+                    found.add(key)
+                node = node.right
+            else:
+                found.update(key for _, _, key in node.by_low)
+                break
+        return found
+
+
+class _Bucket:
+    """Saved searches sharing a city and property type (``None`` for either wildcard).
+
+    Small buckets are scanned directly. Large ones keep a price interval
+    tree; searches added or changed since it was built sit in ``pending``
+    (and, if the tree still holds an old copy, ``stale``) until the next
+    rebuild.
+    """
+
+    __slots__ = ('ids', 'tree', 'tree_ids', 'pending', 'stale')
+
+    def __init__(self):
+        self.ids = set()
+        self.tree = None
+        self.tree_ids = set()
+        self.pending = set()
+        self.stale = set()
+
+    def add(self, search_id):
+        self.ids.add(search_id)
+        if search_id in self.tree_ids:
+            self.stale.add(search_id)
+        self.pending.add(search_id)
+
+    def discard(self, search_id):
+        self.ids.discard(search_id)
+        if search_id in self.tree_ids:
+            self.stale.add(search_id)
+        self.pending.discard(search_id)
+
+    def rebuild(self, searches):
+        self.tree = IntervalTree(
+            (searches[search_id]['min_price'], searches[search_id]['max_price'], search_id)
+            for search_id in self.ids
+        )
+        self.tree_ids = set(self.ids)
+        self.pending.clear()
+        self.stale.clear()
+
+
+class SavedSearchIndex:
+    """In-memory index of saved search predicates.
+
+    Searches are bucketed by (city, property type), with ``None`` standing
+    for a criterion the search leaves open, so a listing only looks at the
+    four buckets it can fall into and never at searches for other cities.
+    Within a bucket, prices are checked directly or, once the bucket is
+    large, through its own interval tree; bedroom bounds are checked on the
+    survivors. A bucket's tree is only rebuilt once enough changes pile up,
+    so a steady trickle of new searches does not cost a rebuild per listing.
+
+    The index is per process. Changes made through the API only reach the
+    process that served them, so every process reloads the index from the
+    database once it is older than ``SAVED_SEARCH_INDEX_MAX_AGE`` seconds,
+    and alert delivery drops ids whose search has since been deleted.
+    """
+
+    # Below this many searches, checking a bucket's prices directly is
+    # cheaper than keeping a tree for it
+    LINEAR_SCAN_MAX = 128
+    REBUILD_MIN_CHANGES = 64
+
+    def __init__(self):
+        self._lock = RLock()
+        self._loaded_at = None
+        self._searches = {}
+        self._buckets = {}
+
+    @staticmethod
+    def _entry(search):
+        return {
+            'city': search.city.strip().lower() if search.city else None,
+            'property_type': search.property_type or None,
+            'min_price': _bound(search.min_price, _NEG_INF),
+            'max_price': _bound(search.max_price, _POS_INF),
+            'min_bedrooms': search.min_bedrooms,
+            'max_bedrooms': search.max_bedrooms,
+        }
+
+    def load(self):
+        with self._lock:
+            self._searches.clear()
+            self._buckets.clear()
+            for search in SavedSearch.query.yield_per(1000):
+                self._insert(search.id, self._entry(search))
+            self._loaded_at = monotonic()
+
+    def ensure_fresh(self, max_age):
+        """Reload from the database if never loaded or older than ``max_age``."""
+        with self._lock:
+            if self._loaded_at is None or monotonic() - self._loaded_at > max_age:
+                self.load()
+
+    def _insert(self, search_id, entry):
+        self._searches[search_id] = entry
+        self._buckets.setdefault((entry['city'], entry['property_type']), _Bucket()).add(search_id)
+
+    def add(self, search):
+        with self._lock:
+            if self._loaded_at is not None:
+                self.remove(search.id)
+                self._insert(search.id, self._entry(search))
+
+    def remove(self, search_id):
+        with self._lock:
+            entry = self._searches.pop(search_id, None)
+            if entry is None:
+                return
+            key = (entry['city'], entry['property_type'])
+            bucket = self._buckets[key]
+            bucket.discard(search_id)
+            if not bucket.ids:
+                del self._buckets[key]
+
+    def _in_price_range(self, search_id, price):
+        entry = self._searches[search_id]
+        return entry['min_price'] <= price <= entry['max_price']
+
+    def _priced(self, bucket, price):
+        if len(bucket.ids) <= self.LINEAR_SCAN_MAX:
+            return {i for i in bucket.ids if self._in_price_range(i, price)}
+        if bucket.tree is None or \
+                len(bucket.pending) + len(bucket.stale) > max(self.REBUILD_MIN_CHANGES, len(bucket.ids) // 8):
+            bucket.rebuild(self._searches)
+        found = bucket.tree.stab(price) - bucket.stale
+        found.update(i for i in bucket.pending if self._in_price_range(i, price))
+        return found
+
+    def match(self, city, property_type, price, bedrooms):
+        """Return the ids of saved searches matching a listing."""
+        with self._lock:
+            if self._loaded_at is None:
+                self.load()
+            city = (city or '').strip().lower() or None
+            price = float(price)
+            matched = set()
+            for key in {(c, t) for c in (city, None) for t in (property_type or None, None)}:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    continue
+                for search_id in self._priced(bucket, price):
+                    entry = self._searches[search_id]
+                    if (entry['min_bedrooms'] is None or bedrooms >= entry['min_bedrooms']) \
+                            and (entry['max_bedrooms'] is None or bedrooms <= entry['max_bedrooms']):
+                        matched.add(search_id)
+            return matched
+
+
+saved_search_index = SavedSearchIndex()
+_executor = None
+
+
+def _get_executor(app):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=app.config.get('SAVED_SEARCH_ALERT_WORKERS', 2),
+            thread_name_prefix='saved-search-alerts'
+        )
+    return _executor
+
+
+def _insert_ignoring_duplicates(rows):
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    db.session.execute(insert(SearchAlert).values(rows).on_conflict_do_nothing())
+
+
+def _deliver_alerts(app, listings):
+    with app.app_context():
+        try:
+            saved_search_index.ensure_fresh(app.config.get('SAVED_SEARCH_INDEX_MAX_AGE', 60))
+            alerts = [
+                {'saved_search_id': search_id, 'property_id': listing['id']}
+                for listing in listings
+                for search_id in saved_search_index.match(
+                    listing['city'], listing['property_type'], listing['price'], listing['bedrooms']
+                )
+            ]
+            if not alerts:
+                return
+            # The index may still hold searches deleted by another process
+            matched = {alert['saved_search_id'] for alert in alerts}
+            live = {search_id for (search_id,) in
+                    db.session.query(SavedSearch.id).filter(SavedSearch.id.in_(matched))}
+            for search_id in matched - live:
+                saved_search_index.remove(search_id)
+            alerts = [alert for alert in alerts if alert['saved_search_id'] in live]
+            if alerts:
+                # Duplicates (already alerted, or a concurrent worker) are skipped row by row
+                _insert_ignoring_duplicates(alerts)
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception('Failed to deliver saved search alerts')
+        finally:
+            db.session.remove()
+
+
+def notify_matching_searches(properties):
+    """Queue alerts for saved searches matching the given properties.
+
+    Matching and alert persistence happen on a background worker, so the
+    caller only pays for snapshotting the listings. Call after commit.
+    """
+    listings = [
+        {
+            'id': property.id,
+            'city': property.city,
+            'property_type': property.property_type,
+            'price': property.price,
+            'bedrooms': property.bedrooms,
+        }
+        for property in properties
+    ]
+    if not listings:
+        return
+    app = current_app._get_current_object()
+    after_commit(lambda: _get_executor(app).submit(_deliver_alerts, app, listings))
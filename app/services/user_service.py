@@ -0,0 +1,186 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import func, or_
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models.models import User, Property, SavedSearch
+from app.schemas.schemas import UserSchema
+from app.services.saved_search_service import saved_search_index
+from app.utils.helpers import with_fields, after_commit
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_users(prefix=None, role=None, after=None, limit=50, fields=None):
+    """Return one page of users ordered by id, plus the cursor for the next.
+
+    Uses keyset pagination (``id > after``) so deep pages cost the same as
+    the first one. ``prefix`` matches the start of the username or email,
+    case-insensitively, through the ``lower()`` functional indexes.
+    """
+    query = with_fields(User.query, User, fields)
+    if prefix:
+        pattern = _escape_like(prefix.lower()) + '%'
+        query = query.filter(or_(
+            func.lower(User.username).like(pattern, escape='\\'),
+            func.lower(User.email).like(pattern, escape='\\'),
+        ))
+    if role:
+        query = query.filter(User.role == role)
+    if after is not None:
+        query = query.filter(User.id > after)
+
+    users = query.order_by(User.id).limit(limit + 1).all()
+    next_cursor = users[limit - 1].id if len(users) > limit else None
+    return users[:limit], next_cursor
+
+
+def _hash_passwords(passwords):
+    workers = current_app.config.get('USER_IMPORT_HASH_WORKERS') or os.cpu_count() or 1
+    # hashlib releases the GIL while deriving keys, so threads hash in parallel
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(generate_password_hash, passwords))
+
+
+def import_users(records):
+    """Validate, hash and insert many users at once.
+
+    Records that fail validation or collide with an existing (or earlier)
+    username/email are skipped and reported. Returns ``(created, skipped)``.
+    """
+    batch_size = current_app.config.get('USER_IMPORT_BATCH_SIZE', 100)
+    schema = UserSchema()
+    skipped = []
+    valid = []
+    seen_emails = set()
+    seen_usernames = set()
+
+    for index, record in enumerate(records):
+        try:
+            data = schema.load(record)
+        except ValidationError as err:
+            skipped.append({'index': index, 'reason': err.messages})
+            continue
+        email = data['email'].lower()
+        username = data['username'].lower()
+        if email in seen_emails or username in seen_usernames:
+            skipped.append({'index': index, 'reason': 'Duplicate username or email in import'})
+            continue
+        seen_emails.add(email)
+        seen_usernames.add(username)
+        valid.append((index, data))
+
+    created = 0
+    for start in range(0, len(valid), batch_size):
+        batch = valid[start:start + batch_size]
+        emails = [data['email'].lower() for _, data in batch]
+        usernames = [data['username'].lower() for _, data in batch]
+        taken = db.session.query(func.lower(User.email), func.lower(User.username)).filter(or_(
+            func.lower(User.email).in_(emails),
+            func.lower(User.username).in_(usernames),
+        )).all()
+        taken_emails = {email for email, _ in taken}
+        taken_usernames = {username for _, username in taken}
+
+        rows = []
+        for index, data in batch:
+            if data['email'].lower() in taken_emails or data['username'].lower() in taken_usernames:
+                skipped.append({'index': index, 'reason': 'Username or email already registered'})
+                continue
+            rows.append(data)
+
+        hashes = _hash_passwords([data.pop('password') for data in rows])
+        for data, password_hash in zip(rows, hashes):
+            data['password_hash'] = password_hash
+
+        if rows:
+            db.session.bulk_insert_mappings(User, rows)
+            db.session.commit()
+            created += len(rows)
+
+    return created, sorted(skipped, key=lambda entry: entry['index'])
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='purge')
+    return _executor
+
+
+def _saved_search_ids(user_id):
+    return [search_id for (search_id,) in db.session.query(SavedSearch.id).filter_by(user_id=user_id)]
+
+
+def _forget_saved_searches(search_ids):
+    """Drop deleted searches from the match index once the delete is committed.
+
+    The rows themselves go with ON DELETE CASCADE, which the index never
+    hears about; left behind, they would keep matching new listings.
+    """
+    def forget():
+        for search_id in search_ids:
+            saved_search_index.remove(search_id)
+
+    after_commit(forget)
+
+
+def _purge_user(app, user_id):
+    """Delete a user's listings a chunk at a time, then the user.
+
+    Each chunk is its own short transaction, and the database cascades the
+    photos, statuses, likes, comments and inquiries of the deleted rows, so
+    no lock is held for the length of the whole purge.
+    """
+    chunk_size = app.config.get('PURGE_CHUNK_SIZE', 200)
+    with app.app_context():
+        try:
+            while True:
+                ids = [row.id for row in db.session.query(Property.id)
+                       .filter_by(broker_id=user_id).limit(chunk_size)]
+                if not ids:
+                    break
+                Property.query.filter(Property.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+            search_ids = _saved_search_ids(user_id)
+            User.query.filter_by(id=user_id).delete(synchronize_session=False)
+            db.session.commit()
+            _forget_saved_searches(search_ids)
+        except Exception:
+            db.session.rollback()
+            logger.exception('Failed to purge user %s', user_id)
+        finally:
+            db.session.remove()
+
+
+def delete_user(user):
+    """Delete a user and everything that depends on them.
+
+    Users with at most ``PURGE_INLINE_LIMIT`` listings are deleted right away
+    with a single statement. Larger purges are handed to a background worker
+    and ``False`` is returned so the caller can answer 202.
+    """
+    limit = current_app.config.get('PURGE_INLINE_LIMIT', 100)
+    has_many = db.session.query(Property.id).filter_by(broker_id=user.id).offset(limit).first() is not None
+    if not has_many:
+        search_ids = _saved_search_ids(user.id)
+        db.session.delete(user)
+        db.session.commit()
+        _forget_saved_searches(search_ids)
+        return True
+
+    app = current_app._get_current_object()
+    user_id = user.id
+    after_commit(lambda: _get_executor().submit(_purge_user, app, user_id))
+    return False
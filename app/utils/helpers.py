@@ -0,0 +1,104 @@
+import gzip
+
+from flask import current_app, request
+from flask_restx import abort
+from sqlalchemy.orm import load_only
+
+from app import db
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+
+def sparse_fields(schema_cls):
+    """Parse the ``fields=`` query parameter against a schema.
+
+    Returns a tuple of requested field names, or ``None`` when the client
+    wants the full representation. Unknown names abort with a 400.
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    requested = tuple(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    available = schema_cls().dump_fields
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        abort(400, f'Unknown fields: {", ".join(unknown)}')
+    return requested or None
+
+
+def with_fields(query, model, fields):
+    """Defer every column not named in ``fields`` at the SQL level."""
+    if not fields:
+        return query
+    columns = [getattr(model, name) for name in fields if name in model.__table__.columns]
+    return query.options(load_only(*columns)) if columns else query
+
+
+def after_commit(callback):
+    """Run ``callback`` once the current unit of work is committed.
+
+    Views call this right after ``db.session.commit()``, so it normally runs
+    immediately. Inside an atomic batch, where view commits are deferred,
+    the callback is queued until the batch's single commit succeeds.
+    """
+    pending = db.session.info.get('after_commit')
+    if pending is None:
+        callback()
+    else:
+        pending.append(callback)
+
+
+def _parse_accept_encoding(header):
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def compress_response(response):
+    """Compress a response with the best encoding the client accepts.
+
+    Picks the supported coding with the highest q-value, breaking ties in
+    favour of zstd (when the ``zstandard`` package is installed) over gzip.
+    Bodies below ``COMPRESS_MIN_SIZE`` are left alone since the framing
+    overhead outweighs the savings.
+    """
+    config = current_app.config
+    if (response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in config['COMPRESS_MIMETYPES']):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+
+    accepted = _parse_accept_encoding(request.headers.get('Accept-Encoding', ''))
+    supported = ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+    quality = {coding: accepted.get(coding, accepted.get('*', 0)) for coding in supported}
+    # max() keeps the first of equal candidates, so ties go to zstd
+    encoding = max(supported, key=quality.get)
+    if quality[encoding] <= 0:
+        return response
+    if encoding == 'zstd':
+        data = zstandard.ZstdCompressor(level=config['COMPRESS_ZSTD_LEVEL']).compress(data)
+    else:
+        data = gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'])
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,260 @@
+from collections import Counter
+from threading import BoundedSemaphore, Lock
+from time import monotonic, time
+import math
+
+from flask import g, jsonify, request
+
+try:
+    import redis
+except ImportError:  # The shared store is optional; memory is always available
+    redis = None
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(rate):
+    """Parse ``'60/minute'`` into ``(tokens_per_second, capacity)``."""
+    count, _, period = rate.partition('/')
+    count = int(count)
+    seconds = _PERIODS[period.strip().rstrip('s')]
+    return count / seconds, count
+
+
+class MemoryStore:
+    """In-process token buckets, one per key.
+
+    Also stands in for the shared store in development and tests, where a
+    single process sees all the traffic anyway.
+    """
+
+    def __init__(self, prune_every=10000):
+        self._buckets = {}
+        self._lock = Lock()
+        self._prune_every = prune_every
+        self._calls = 0
+
+    def consume(self, key, rate, capacity, cost=1):
+        """Take ``cost`` tokens; return 0 if allowed, else seconds to wait."""
+        now = monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, None))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                tokens = min(capacity, tokens - cost)  # A negative cost is a refund
+                retry_after = 0.0
+            else:
+                retry_after = (cost - tokens) / rate
+            # Remember when the bucket will be full again so it can be pruned
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            self._calls += 1
+            if self._calls >= self._prune_every:
+                self._prune(now)
+            return retry_after
+
+    def refund(self, key, rate, capacity, cost=1):
+        """Give back tokens for a request that was not served after all."""
+        self.consume(key, rate, capacity, -cost)
+
+    def _prune(self, now):
+        # Dropping a bucket that has refilled is equivalent to keeping a full one
+        self._calls = 0
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items() if bucket[2] > now
+        }
+
+
+class RedisStore:
+    """Token buckets shared by every worker through Redis.
+
+    The refill-and-take step runs as a Lua script so it is atomic across
+    processes; buckets expire once they would have refilled completely.
+    """
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local now = tonumber(ARGV[4])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local retry_after = 0
+    if tokens >= cost then
+        tokens = math.min(capacity, tokens - cost)
+    else
+        retry_after = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(retry_after)
+    """
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self._client = client
+        self._prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def consume(self, key, rate, capacity, cost=1):
+        return float(self._script(keys=[self._prefix + key], args=[rate, capacity, cost, time()]))
+
+    def refund(self, key, rate, capacity, cost=1):
+        self.consume(key, rate, capacity, -cost)
+
+
+def create_store(url):
+    """Build the bucket store named by ``RATELIMIT_STORAGE_URL``."""
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        if redis is None:
+            raise RuntimeError('RATELIMIT_STORAGE_URL points at Redis but the redis package is not installed')
+        return RedisStore(redis.Redis.from_url(url))
+    if url == 'memory://':
+        return MemoryStore()
+    raise ValueError(f'Unsupported RATELIMIT_STORAGE_URL: {url}')
+
+
+class RateLimiter:
+    """Per-client token-bucket limits plus a cap on concurrent requests.
+
+    Limits are looked up by endpoint (e.g. ``auth_login``), then namespace
+    (e.g. ``property``), then ``RATELIMIT_DEFAULT``. Anonymous callers get a
+    bucket per client IP. Authenticated callers get a bucket per user and
+    are also charged to a shared bucket for their IP, ``RATELIMIT_IP_FACTOR``
+    times larger, so many accounts on one address cannot multiply its quota.
+
+    When ``ADMISSION_MAX_IN_FLIGHT`` requests are running, newcomers wait
+    up to ``ADMISSION_QUEUE_TIMEOUT`` seconds for a slot, and are turned away
+    with 503 at once if ``ADMISSION_MAX_QUEUED`` are already waiting.
+    ``RATELIMIT_ENABLED`` and ``ADMISSION_ENABLED`` switch the two halves
+    independently.
+    """
+
+    def __init__(self, app=None):
+        self.store = None
+        self.counters = Counter()
+        self._lock = Lock()
+        self._in_flight = 0
+        self._queued = 0
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.enabled = config.get('RATELIMIT_ENABLED', True)
+        self.store = config.get('RATELIMIT_STORE') or create_store(config.get('RATELIMIT_STORAGE_URL', 'memory://'))
+        self.default = parse_rate(config.get('RATELIMIT_DEFAULT', '300/minute'))
+        self.rules = {scope: parse_rate(rate) for scope, rate in config.get('RATELIMIT_RULES', {}).items()}
+        self.exempt = set(config.get('RATELIMIT_EXEMPT', ()))
+        self.trust_proxy = config.get('RATELIMIT_TRUST_PROXY', False)
+        self.ip_factor = config.get('RATELIMIT_IP_FACTOR', 4)
+        self.admission_enabled = config.get('ADMISSION_ENABLED', True)
+        self.max_in_flight = config.get('ADMISSION_MAX_IN_FLIGHT', 64)
+        self.max_queued = config.get('ADMISSION_MAX_QUEUED', 32)
+        self.queue_timeout = config.get('ADMISSION_QUEUE_TIMEOUT', 2.0)
+        self._slots = BoundedSemaphore(self.max_in_flight)
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        app.extensions['rate_limiter'] = self
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'queued': self._queued,
+                'max_in_flight': self.max_in_flight,
+                'counters': dict(self.counters)
+            }
+
+    def _buckets(self, scope, rate, capacity):
+        """Return the ``(key, rate, capacity)`` buckets this request is charged to."""
+        from app.routes.auth import get_token_user_id
+
+        address = request.access_route[0] if self.trust_proxy and request.access_route else request.remote_addr
+        user_id = get_token_user_id()
+        if user_id is None:
+            return [(f'{scope}:ip:{address}', rate, capacity)]
+        return [
+            (f'{scope}:user:{user_id}', rate, capacity),
+            (f'{scope}:users-at:{address}', rate * self.ip_factor, capacity * self.ip_factor),
+        ]
+
+    def _limit_for(self):
+        if request.endpoint in self.rules:
+            return request.endpoint, self.rules[request.endpoint]
+        namespace = request.url_rule.rule.strip('/').split('/')[0] if request.url_rule else ''
+        if namespace in self.rules:
+            return namespace, self.rules[namespace]
+        return 'default', self.default
+
+    @staticmethod
+    def _reject(status, message, retry_after):
+        response = jsonify({'message': message})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def _refund(self, charged):
+        for key, rate, capacity in charged:
+            self.store.refund(key, rate, capacity)
+
+    def _shed(self, reason, charged):
+        # The client was not served, so it should not pay for the attempt
+        self._refund(charged)
+        self._count(f'shed.{reason}')
+        return self._reject(503, 'Server busy, please retry', self.queue_timeout)
+
+    def _before_request(self):
+        # Unrouted requests (404/405 probes) have no endpoint and fall under the default limit
+        if request.endpoint in self.exempt:
+            return None
+
+        charged = []
+        if self.enabled:
+            scope, (rate, capacity) = self._limit_for()
+            for bucket in self._buckets(scope, rate, capacity):
+                retry_after = self.store.consume(*bucket)
+                if retry_after > 0:
+                    self._refund(charged)
+                    self._count(f'limited.{scope}')
+                    return self._reject(429, 'Too many requests', retry_after)
+                charged.append(bucket)
+            self._count(f'allowed.{scope}')
+
+        if not self.admission_enabled or g.get('_rate_limiter_slot'):
+            return None  # The outer request of an in-process batch already holds the slot
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                queue_full = self._queued >= self.max_queued
+                if not queue_full:
+                    self._queued += 1
+            if queue_full:
+                return self._shed('queue_full', charged)
+            try:
+                admitted = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._queued -= 1
+            if not admitted:
+                return self._shed('timeout', charged)
+
+        # Released by whichever request acquired it; batch sub-requests share g
+        request.environ['rate_limiter.admitted'] = True
+        g._rate_limiter_slot = True
+        with self._lock:
+            self._in_flight += 1
+        return None
+
+    def _teardown_request(self, exc=None):
+        if request.environ.pop('rate_limiter.admitted', False):
+            g.pop('_rate_limiter_slot', None)
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
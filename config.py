@@ -9,8 +9,54 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'  # Changed from DJANGO_DEBUG
+    RESTX_JSON = {'default': str}  # Serialize Numeric columns (Decimal) and other non-JSON types
     
     # JWT Settings
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+
+    # Saved search alerts
+    SAVED_SEARCH_ALERT_WORKERS = int(os.getenv('SAVED_SEARCH_ALERT_WORKERS', 2))
+    # The match index is per process; reload it so other workers' changes show up
+    SAVED_SEARCH_INDEX_MAX_AGE = int(os.getenv('SAVED_SEARCH_INDEX_MAX_AGE', 60))
+
+    # Bulk user import; the cap keeps one request's password hashing to a few seconds
+    USER_IMPORT_MAX_RECORDS = int(os.getenv('USER_IMPORT_MAX_RECORDS', 200))
+    USER_IMPORT_BATCH_SIZE = int(os.getenv('USER_IMPORT_BATCH_SIZE', 100))
+    USER_IMPORT_HASH_WORKERS = int(os.getenv('USER_IMPORT_HASH_WORKERS', os.cpu_count() or 1))
+
+    # Response compression (zstd requires the optional zstandard package)
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_ZSTD_LEVEL = int(os.getenv('COMPRESS_ZSTD_LEVEL', 3))
+    COMPRESS_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+    # Batch endpoint
+    BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 50))
+
+    # User purges: brokers with more listings than this are deleted in background chunks
+    PURGE_INLINE_LIMIT = int(os.getenv('PURGE_INLINE_LIMIT', 100))
+    PURGE_CHUNK_SIZE = int(os.getenv('PURGE_CHUNK_SIZE', 200))
+
+    # Rate limiting: token buckets per user (or per client IP when anonymous).
+    # Authenticated requests are also charged to a per-IP bucket RATELIMIT_IP_FACTOR
+    # times the rule, so many accounts behind one address still hit a limit.
+    # Rules are keyed by endpoint or namespace; use redis://... to share buckets across workers
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'True').lower() == 'true'
+    RATELIMIT_STORAGE_URL = os.getenv('RATELIMIT_STORAGE_URL', 'memory://')
+    RATELIMIT_DEFAULT = os.getenv('RATELIMIT_DEFAULT', '300/minute')
+    RATELIMIT_RULES = {
+        'auth_login': '10/minute',
+        'auth_register': '5/minute',
+        'property_properties': '120/minute',
+    }
+    RATELIMIT_EXEMPT = ('static', 'doc', 'specs', 'root', 'restx_doc.static', 'monitoring_limits')
+    RATELIMIT_TRUST_PROXY = os.getenv('RATELIMIT_TRUST_PROXY', 'False').lower() == 'true'
+    RATELIMIT_IP_FACTOR = int(os.getenv('RATELIMIT_IP_FACTOR', 4))
+
+    # Admission control: shed load early instead of queueing without bound
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'True').lower() == 'true'
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', 64))
+    ADMISSION_MAX_QUEUED = int(os.getenv('ADMISSION_MAX_QUEUED', 32))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 2.0))
@@ -0,0 +1,109 @@
+import sqlite3
+from decimal import Decimal
+
+import jwt
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models.models import User, Property
+from config import Config
+
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are switched on
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
+
+class InlineExecutor:
+    """Runs background jobs synchronously so tests can assert on their effects."""
+
+    def submit(self, fn, *args, **kwargs):
+        fn(*args, **kwargs)
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+        SECRET_KEY = 'test-secret-key-that-is-long-enough-for-hs256'
+        RATELIMIT_ENABLED = False
+
+    return create_app(TestConfig)
+
+
+@pytest.fixture(autouse=True)
+def database(app, monkeypatch):
+    from app.services import saved_search_service, user_service
+
+    monkeypatch.setattr(saved_search_service, '_get_executor', lambda *args: InlineExecutor())
+    monkeypatch.setattr(user_service, '_get_executor', lambda *args: InlineExecutor(), raising=False)
+    saved_search_service.saved_search_index._loaded_at = None
+
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(username, role, email=None):
+    user = User(
+        username=username,
+        email=email or f'{username}@example.com',
+        password_hash=generate_password_hash('secret1'),
+        role=role
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_property(broker, **overrides):
+    data = dict(
+        title='Flat', price=Decimal('1500.00'), address='1 Main St', city='New York', state='NY',
+        zip_code='10001', property_type='apartment', bedrooms=2, bathrooms=1, broker_id=broker.id
+    )
+    data.update(overrides)
+    property = Property(**data)
+    db.session.add(property)
+    db.session.commit()
+    return property
+
+
+def listing(property):
+    """Snapshot a property the way ``notify_matching_searches`` hands it to alert delivery."""
+    return {
+        'id': property.id, 'city': property.city, 'property_type': property.property_type,
+        'price': property.price, 'bedrooms': property.bedrooms
+    }
+
+
+def auth_header(app, user):
+    token = jwt.encode({'user_id': user.id}, app.config['SECRET_KEY'], algorithm='HS256')
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def admin():
+    return make_user('admin', 'admin')
+
+
+@pytest.fixture
+def broker():
+    return make_user('broker', 'broker')
+
+
+@pytest.fixture
+def customer():
+    return make_user('customer', 'customer')
@@ -0,0 +1,55 @@
+from app import db
+from app.models.models import User, Property, PropertyPhoto, PropertyStatus, Like, Comment
+from app.services.user_service import delete_user
+from conftest import make_property
+
+
+def make_listing(broker, customer):
+    """A property with one of each child row, as the cascade tests need."""
+    property = make_property(broker)
+    db.session.add_all([
+        PropertyPhoto(property_id=property.id, photo_url='http://example.com/1.jpg'),
+        PropertyStatus(property_id=property.id, status='available'),
+        Like(property_id=property.id, user_id=customer.id),
+        Comment(property_id=property.id, user_id=customer.id, content='Nice'),
+    ])
+    db.session.commit()
+    return property
+
+
+def test_deleting_property_cascades_in_database(broker, customer):
+    property_id = make_listing(broker, customer).id
+    db.session.expunge_all()  # Nothing loaded, so only the database can remove the children
+
+    db.session.delete(db.session.get(Property, property_id))
+    db.session.commit()
+
+    for model in (PropertyPhoto, PropertyStatus, Like, Comment):
+        assert model.query.count() == 0
+
+
+def test_deleting_customer_removes_their_activity(broker, customer):
+    make_listing(broker, customer)
+    assert delete_user(customer) is True
+    assert Like.query.count() == 0
+    assert Comment.query.count() == 0
+    assert Property.query.count() == 1
+
+
+def test_large_purge_runs_in_chunks(app, monkeypatch, broker, customer):
+    monkeypatch.setitem(app.config, 'PURGE_INLINE_LIMIT', 2)
+    monkeypatch.setitem(app.config, 'PURGE_CHUNK_SIZE', 2)
+    for _ in range(5):
+        make_listing(broker, customer)
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    db.event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert delete_user(broker) is False
+    finally:
+        db.event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert Property.query.count() == 0
+    assert PropertyPhoto.query.count() == 0
+    assert User.query.filter_by(id=broker.id).count() == 0
+    assert sum(s.startswith('DELETE FROM properties') for s in statements) == 3
@@ -0,0 +1,284 @@
+import gzip
+import json
+import types
+from collections import Counter
+
+import pytest
+from sqlalchemy import event
+
+from app import db, limiter
+from app.models.models import Property, PropertyPhoto, PropertyStatus, Comment, SavedSearch
+from app.services.saved_search_service import saved_search_index
+from app.utils import helpers
+from app.utils.rate_limit import MemoryStore, parse_rate
+from conftest import auth_header
+
+
+# Users
+
+def test_import_rejects_oversized_payload(app, client, admin, monkeypatch):
+    monkeypatch.setitem(app.config, 'USER_IMPORT_MAX_RECORDS', 2)
+    users = [{'username': f'agent{i}', 'email': f'a{i}@example.com', 'password': 'secret1', 'role': 'broker'}
+             for i in range(3)]
+    response = client.post('/user/users/import', json={'users': users}, headers=auth_header(app, admin))
+    assert response.status_code == 413
+
+
+def test_user_responses_never_include_password_hash(app, client, admin):
+    response = client.get(f'/user/users/{admin.id}', headers=auth_header(app, admin))
+    assert response.status_code == 200
+    assert 'password_hash' not in response.get_json()
+    assert 'password_hash' not in client.get('/user/users', headers=auth_header(app, admin)).get_json()['users'][0]
+
+
+def test_create_user_accepts_phone_number_and_rejects_duplicates(app, client, admin):
+    new_user = {'username': 'Agent', 'email': 'agent@example.com', 'password': 'secret1',
+                'role': 'broker', 'phone_number': '5551234'}
+    response = client.post('/user/users', json=new_user, headers=auth_header(app, admin))
+    assert response.status_code == 201
+    assert response.get_json()['phone_number'] == '5551234'
+
+    same_username = dict(new_user, username='AGENT', email='other@example.com')
+    response = client.post('/user/users', json=same_username, headers=auth_header(app, admin))
+    assert response.status_code == 409
+    same_email = dict(new_user, username='other', email='Agent@Example.com')
+    assert client.post('/user/users', json=same_email, headers=auth_header(app, admin)).status_code == 409
+
+    bad_phone = dict(new_user, username='third', email='third@example.com', phone_number='555-1234')
+    response = client.post('/user/users', json=bad_phone, headers=auth_header(app, admin))
+    assert response.status_code == 400
+    assert 'phone_number' in response.get_json()['message']
+
+
+# Sparse fieldsets and compression
+
+@pytest.fixture
+def listings(broker):
+    for i in range(20):
+        db.session.add(Property(
+            title=f'Flat {i}', description='x' * 500, price=1500, address='1 Main St', city='New York',
+            state='NY', zip_code='10001', property_type='apartment', bedrooms=2, bathrooms=1, broker_id=broker.id
+        ))
+    db.session.commit()
+
+
+def test_fields_limits_output_and_selected_columns(client, listings):
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/property/properties?fields=id,title,city')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 200
+    assert set(response.get_json()[0]) == {'id', 'title', 'city'}
+    select = next(s for s in statements if 'FROM properties' in s)
+    assert 'properties.title' in select
+    assert 'properties.description' not in select
+
+
+def test_cover_photo_costs_one_query_only_when_requested(client, listings):
+    first = db.session.get(Property, 1)
+    db.session.add_all([
+        PropertyPhoto(property_id=first.id, photo_url='https://example.com/first.jpg'),
+        PropertyPhoto(property_id=first.id, photo_url='https://example.com/second.jpg'),
+    ])
+    db.session.commit()
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        cards = client.get('/property/properties?fields=id,title,price,city,cover_photo').get_json()
+        photo_queries = sum('FROM property_photos' in s for s in statements)
+        statements.clear()
+        plain = client.get('/property/properties?fields=id,title').get_json()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert photo_queries == 1
+    assert set(cards[0]) == {'id', 'title', 'price', 'city', 'cover_photo'}
+    assert cards[0]['cover_photo'] == 'https://example.com/first.jpg'
+    assert cards[1]['cover_photo'] is None
+    assert not any('FROM property_photos' in s for s in statements)
+    assert 'cover_photo' not in plain[0]
+
+
+def test_unknown_field_is_rejected(client, listings):
+    response = client.get('/property/properties?fields=id,bogus')
+    assert response.status_code == 400
+    assert 'bogus' in response.get_json()['message']
+
+
+def test_gzip_is_negotiated_above_threshold(client, listings):
+    response = client.get('/property/properties', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(json.loads(gzip.decompress(response.data))) == 20
+
+
+def test_no_compression_when_refused_with_q0(client, listings):
+    response = client.get('/property/properties', headers={'Accept-Encoding': 'gzip;q=0, zstd;q=0'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(response.get_json()) == 20
+
+
+@pytest.fixture
+def fake_zstd(monkeypatch):
+    class ZstdCompressor:
+        def __init__(self, level):
+            pass
+
+        def compress(self, data):
+            return b'zstd:' + data
+
+    monkeypatch.setattr(helpers, 'zstandard', types.SimpleNamespace(ZstdCompressor=ZstdCompressor))
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip;q=1, zstd;q=0.1', 'gzip'),
+    ('gzip;q=0.5, zstd;q=0.8', 'zstd'),
+    ('gzip, zstd', 'zstd'),
+    ('zstd;q=0, *', 'gzip'),
+])
+def test_highest_q_wins_and_ties_go_to_zstd(client, listings, fake_zstd, accept_encoding, expected):
+    response = client.get('/property/properties', headers={'Accept-Encoding': accept_encoding})
+    assert response.headers['Content-Encoding'] == expected
+
+
+def test_small_responses_are_not_compressed(client, listings):
+    response = client.get('/property/properties/1?fields=id', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.get_json() == {'id': 1}
+
+
+def test_zstd_is_preferred_when_available(client, listings):
+    zstandard = pytest.importorskip('zstandard')
+    response = client.get('/property/properties', headers={'Accept-Encoding': 'gzip, zstd'})
+    assert response.headers['Content-Encoding'] == 'zstd'
+    assert len(json.loads(zstandard.ZstdDecompressor().decompressobj().decompress(response.data))) == 20
+
+
+# Batch
+
+NEW_PROPERTY = {
+    'title': 'Flat', 'price': 1500, 'address': '1 Main St', 'city': 'New York', 'state': 'NY',
+    'zip_code': '10001', 'property_type': 'apartment', 'bedrooms': 2, 'bathrooms': 1
+}
+
+
+def test_atomic_batch_rolls_back_and_reports_skipped(app, client, broker):
+    response = client.post('/batch', headers=auth_header(app, broker), json={'atomic': True, 'requests': [
+        {'id': 'create', 'method': 'POST', 'path': '/property/properties', 'body': NEW_PROPERTY},
+        {'id': 'missing', 'method': 'GET', 'path': '/property/properties/999'},
+        {'id': 'list', 'method': 'GET', 'path': '/property/properties'},
+    ]})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['committed'] is False
+    assert [(r['id'], r['status']) for r in body['responses']] == [('create', 201), ('missing', 404), ('list', 424)]
+    assert Property.query.count() == 0
+    # The commit-to-flush override must not outlive the batch
+    assert 'commit' not in vars(db.session())
+    assert 'after_commit' not in db.session.info
+
+
+def test_atomic_batch_defers_after_commit_callbacks(app, client, customer, monkeypatch):
+    seen = []
+
+    def record_add(search):
+        with db.engine.connect() as connection:
+            persisted = connection.execute(SavedSearch.__table__.select()).all()
+        seen.append((search.id, len(persisted)))
+
+    monkeypatch.setattr(saved_search_index, 'add', record_add)
+    path = f'/user/users/{customer.id}/saved-searches'
+
+    failed = client.post('/batch', headers=auth_header(app, customer), json={'atomic': True, 'requests': [
+        {'method': 'POST', 'path': path, 'body': {'city': 'Boston'}},
+        {'method': 'GET', 'path': '/property/properties/999'},
+    ]})
+    assert failed.get_json()['committed'] is False
+    assert seen == []
+
+    committed = client.post('/batch', headers=auth_header(app, customer), json={'atomic': True, 'requests': [
+        {'method': 'POST', 'path': path, 'body': {'city': 'Boston'}},
+        {'method': 'GET', 'path': path},
+    ]})
+    body = committed.get_json()
+    assert body['committed'] is True
+    # Callback ran only once the row was visible to other connections
+    assert seen == [(body['responses'][0]['body']['id'], 1)]
+    assert len(body['responses'][1]['body']) == 1
+
+
+def test_non_atomic_batch_runs_past_failed_sub_requests(app, client, broker, customer):
+    property = Property(broker_id=broker.id, **NEW_PROPERTY)
+    db.session.add(property)
+    db.session.commit()
+    property_id = property.id
+
+    response = client.post('/batch', headers=auth_header(app, customer), json={'requests': [
+        {'method': 'PUT', 'path': f'/property/properties/{property_id}/status', 'body': {'status': 'rented'}},
+        {'method': 'GET', 'path': '/property/properties/999'},
+        {'method': 'POST', 'path': f'/property/properties/{property_id}/comments',
+         'body': {'user_id': customer.id, 'content': 'Nice'}},
+    ]})
+
+    assert [r['status'] for r in response.get_json()['responses']] == [403, 404, 201]
+    assert 'committed' not in response.get_json()
+    assert PropertyStatus.query.count() == 0
+    assert Comment.query.count() == 1
+
+
+class CountingSlots:
+    def __init__(self):
+        self.acquired = self.released = 0
+
+    def acquire(self, blocking=True, timeout=None):
+        self.acquired += 1
+        return True
+
+    def release(self):
+        self.released += 1
+
+
+def test_batch_sub_requests_use_their_own_buckets_and_share_one_slot(app, client, customer, monkeypatch):
+    monkeypatch.setattr(limiter, 'enabled', True)
+    monkeypatch.setattr(limiter, 'store', MemoryStore())
+    monkeypatch.setattr(limiter, 'counters', Counter())
+    monkeypatch.setattr(limiter, 'rules', {
+        'property_properties': parse_rate('2/minute'), 'user': parse_rate('5/minute')
+    })
+    slots = CountingSlots()
+    monkeypatch.setattr(limiter, '_slots', slots)
+
+    response = client.post('/batch', headers=auth_header(app, customer), json={'requests': [
+        {'method': 'GET', 'path': '/property/properties'},
+        {'method': 'GET', 'path': '/property/properties'},
+        {'method': 'GET', 'path': '/property/properties'},
+        {'method': 'GET', 'path': f'/user/users/{customer.id}'},
+    ]})
+
+    assert [r['status'] for r in response.get_json()['responses']] == [200, 200, 429, 200]
+    assert limiter.counters == Counter({
+        'allowed.default': 1, 'allowed.property_properties': 2, 'limited.property_properties': 1, 'allowed.user': 1
+    })
+    assert (slots.acquired, slots.released) == (1, 1)
+    assert limiter.stats()['in_flight'] == 0
+
+
+def test_batch_reports_unmatched_routes_as_json(app, client, customer):
+    response = client.post('/batch', headers=auth_header(app, customer), json={'requests': [
+        {'method': 'GET', 'path': '/auth/../batch'},
+        {'method': 'DELETE', 'path': '/auth/login'},
+    ]})
+
+    not_found, not_allowed = response.get_json()['responses']
+    assert not_found['status'] == 404
+    assert 'not found' in not_found['body']['message']
+    assert not_allowed['status'] == 405
+    assert 'not allowed' in not_allowed['body']['message']
@@ -0,0 +1,284 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models.models import User, SavedSearch, SearchAlert
+from app.services import saved_search_service, user_service
+from app.services.saved_search_service import IntervalTree, SavedSearchIndex
+from app.services.user_service import delete_user, import_users, search_users
+from conftest import auth_header, listing, make_property, make_user
+
+INF = float('inf')
+
+
+def make_search(user, **criteria):
+    search = SavedSearch(user_id=user.id, **criteria)
+    db.session.add(search)
+    db.session.commit()
+    return search
+
+
+# IntervalTree
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    for key in range(300):
+        low, high = sorted((rng.randint(0, 100), rng.randint(0, 100)))
+        intervals.append((low, high, key))
+    tree = IntervalTree(intervals)
+    for x in range(-1, 102):
+        assert tree.stab(x) == {key for low, high, key in intervals if low <= x <= high}
+
+
+def test_interval_tree_open_bounds_and_center():
+    intervals = [(-INF, 10, 'upto10'), (5, INF, 'from5'), (-INF, INF, 'any'), (7, 7, 'exactly7')]
+    tree = IntervalTree(intervals)
+    center = tree.root.center
+    assert tree.stab(center) == {key for low, high, key in intervals if low <= center <= high}
+    assert tree.stab(7) == {'upto10', 'from5', 'any', 'exactly7'}
+    assert tree.stab(-1e9) == {'upto10', 'any'}
+    assert tree.stab(1e9) == {'from5', 'any'}
+    assert tree.stab(10) == {'upto10', 'from5', 'any'}
+
+
+def test_interval_tree_empty():
+    assert IntervalTree([]).stab(5) == set()
+
+
+# SavedSearchIndex
+
+@pytest.fixture
+def index_with_searches(customer):
+    searches = {
+        'nyc_apartment': make_search(customer, city='New York', property_type='apartment', min_price=1000, max_price=2000),
+        'nyc_any_type': make_search(customer, city='new york', max_price=1200),
+        'any_city_house': make_search(customer, property_type='house'),
+        'two_to_three_beds': make_search(customer, min_bedrooms=2, max_bedrooms=3),
+        'boston': make_search(customer, city='Boston'),
+    }
+    index = SavedSearchIndex()
+    index.load()
+    return index, {name: search.id for name, search in searches.items()}
+
+
+def test_match_uses_wildcards_and_bedroom_bounds(index_with_searches):
+    index, ids = index_with_searches
+    assert index.match(' NEW YORK ', 'apartment', Decimal('1100'), 2) == {
+        ids['nyc_apartment'], ids['nyc_any_type'], ids['two_to_three_beds']
+    }
+    assert index.match('New York', 'apartment', Decimal('1500'), 4) == {ids['nyc_apartment']}
+    assert index.match('Chicago', 'house', Decimal('900000'), 1) == {ids['any_city_house']}
+    assert index.match('Chicago', 'apartment', Decimal('100'), 1) == set()
+
+
+def test_match_through_tree_and_pending_changes(index_with_searches, customer, monkeypatch):
+    index, ids = index_with_searches
+    monkeypatch.setattr(SavedSearchIndex, 'LINEAR_SCAN_MAX', 0)  # Force the interval tree path
+    assert index.match('New York', 'apartment', Decimal('1100'), 2) == {
+        ids['nyc_apartment'], ids['nyc_any_type'], ids['two_to_three_beds']
+    }
+
+    # Changes made after the tree was built are seen without a rebuild
+    bucket = index._buckets[('new york', None)]
+    tree = bucket.tree
+    added = make_search(customer, city='New York', min_price=1050, max_price=1150)
+    index.add(added)
+    changed = db.session.get(SavedSearch, ids['nyc_any_type'])
+    changed.max_price = 1000
+    index.add(changed)
+    index.remove(ids['two_to_three_beds'])
+    assert index.match('New York', 'apartment', Decimal('1100'), 2) == {ids['nyc_apartment'], added.id}
+    assert bucket.tree is tree
+    assert (None, None) not in index._buckets  # Emptied buckets are dropped
+
+
+def test_tree_is_rebuilt_once_enough_changes_pile_up(index_with_searches, customer, monkeypatch):
+    index, ids = index_with_searches
+    monkeypatch.setattr(SavedSearchIndex, 'LINEAR_SCAN_MAX', 0)
+    monkeypatch.setattr(SavedSearchIndex, 'REBUILD_MIN_CHANGES', 2)
+    index.match('New York', 'apartment', Decimal('1100'), 2)
+    bucket = index._buckets[('new york', None)]
+    tree = bucket.tree
+    for _ in range(3):
+        index.add(make_search(customer, city='New York'))
+    index.match('New York', 'apartment', Decimal('1100'), 2)
+    assert bucket.tree is not tree
+    assert not bucket.pending and not bucket.stale
+    assert index._buckets[('boston', None)].tree is None  # Untouched buckets are never built
+
+
+def test_match_cost_depends_on_bucket_not_index_size(monkeypatch):
+    index = SavedSearchIndex()
+    index.load()
+    next_id = iter(range(1, 10 ** 6))
+
+    def add_searches(count, **criteria):
+        for _ in range(count):
+            index.add(SavedSearch(id=next(next_id), **criteria))
+
+    checked = []
+    in_price_range = index._in_price_range
+    monkeypatch.setattr(index, '_in_price_range', lambda *args: checked.append(args) or in_price_range(*args))
+
+    def checks_for_listing():
+        checked.clear()
+        found = index.match('Springfield', 'house', Decimal('1500'), 3)
+        return len(checked), len(found)
+
+    add_searches(20, city='Springfield', property_type='house', max_price=2000)
+    add_searches(10, city='Springfield', min_price=1000)
+    before = checks_for_listing()
+    assert before == (30, 30)
+
+    for city in range(200):
+        add_searches(25, city=f'City {city}', property_type='house')
+    add_searches(500, city='Springfield', property_type='apartment')
+    assert checks_for_listing() == before
+
+
+# Alert delivery
+
+def test_alerts_are_delivered_once(app, broker, customer):
+    search = make_search(customer, city='New York', max_price=2000)
+    property = make_property(broker)
+
+    saved_search_service._deliver_alerts(app, [listing(property)])
+    saved_search_service._deliver_alerts(app, [listing(property)])
+
+    alerts = SearchAlert.query.all()
+    assert [(a.saved_search_id, a.property_id) for a in alerts] == [(search.id, property.id)]
+
+
+def test_duplicate_does_not_drop_other_alerts(app, broker, customer):
+    first = make_search(customer, city='New York')
+    property = make_property(broker)
+    saved_search_service._deliver_alerts(app, [listing(property)])
+    second = make_search(customer, property_type='apartment')
+    saved_search_service.saved_search_index.add(second)
+
+    saved_search_service._deliver_alerts(app, [listing(property)])
+
+    assert {a.saved_search_id for a in SearchAlert.query.all()} == {first.id, second.id}
+
+
+def test_stale_index_entries_are_skipped(app, broker, customer, admin):
+    gone = make_search(customer, city='New York')
+    kept = make_search(admin, city='New York')
+    saved_search_service.saved_search_index.load()
+    # Deleted behind the index's back, as another worker would
+    SavedSearch.query.filter_by(id=gone.id).delete()
+    db.session.commit()
+
+    property = make_property(broker)
+    saved_search_service._deliver_alerts(app, [listing(property)])
+
+    assert [a.saved_search_id for a in SearchAlert.query.all()] == [kept.id]
+    assert gone.id not in saved_search_service.saved_search_index._searches
+
+
+@pytest.mark.parametrize('inline_limit', [100, 0])
+def test_deleting_user_forgets_their_saved_searches(app, monkeypatch, broker, customer, admin, inline_limit):
+    monkeypatch.setitem(app.config, 'PURGE_INLINE_LIMIT', inline_limit)
+    make_search(customer, city='New York')
+    admin_search = make_search(admin, city='New York')
+    make_property(customer)  # Gives the customer a listing so limit 0 takes the purge path
+    saved_search_service.saved_search_index.load()
+
+    assert delete_user(customer) is (inline_limit > 0)
+    assert User.query.filter_by(id=customer.id).count() == 0
+
+    property = make_property(broker)
+    saved_search_service._deliver_alerts(app, [listing(property)])
+    assert [a.saved_search_id for a in SearchAlert.query.filter_by(property_id=property.id)] == [admin_search.id]
+    assert set(saved_search_service.saved_search_index._searches) == {admin_search.id}
+
+
+def test_creating_property_alerts_matching_searches(app, client, broker, customer):
+    response = client.post(f'/user/users/{customer.id}/saved-searches', headers=auth_header(app, customer),
+                           json={'city': 'New York', 'min_bedrooms': 2})
+    assert response.status_code == 201
+    response = client.post('/property/properties', headers=auth_header(app, broker), json={
+        'title': 'Flat', 'price': 1500, 'address': '1 Main St', 'city': 'New York', 'state': 'NY',
+        'zip_code': '10001', 'property_type': 'apartment', 'bedrooms': 2, 'bathrooms': 1
+    })
+    assert response.status_code == 201
+
+    alerts = client.get(f'/user/users/{customer.id}/alerts', headers=auth_header(app, customer)).get_json()
+    assert [a['property_id'] for a in alerts] == [response.get_json()['id']]
+
+
+# User directory and import
+
+def test_search_users_pages_with_cursor():
+    for i in range(5):
+        make_user(f'agent{i}', 'broker')
+    make_user('other', 'customer')
+
+    page, cursor = search_users('AGENT', limit=2)
+    assert [u.username for u in page] == ['agent0', 'agent1']
+    page, cursor = search_users('agent', after=cursor, limit=2)
+    assert [u.username for u in page] == ['agent2', 'agent3']
+    page, cursor = search_users('agent', after=cursor, limit=2)
+    assert [u.username for u in page] == ['agent4']
+    assert cursor is None
+
+
+def test_search_users_matches_email_prefix_and_escapes_wildcards():
+    make_user('a_b', 'customer', email='zed@example.com')
+    make_user('axb', 'customer', email='a%b@example.com')
+    make_user('plain', 'customer', email='Jane@Example.com')
+
+    assert [u.username for u in search_users('a_')[0]] == ['a_b']
+    assert [u.username for u in search_users('a%')[0]] == ['axb']
+    assert [u.username for u in search_users('JANE@')[0]] == ['plain']
+    assert [u.username for u in search_users('zed', role='broker')[0]] == []
+
+
+@pytest.fixture
+def fast_hashing(monkeypatch):
+    monkeypatch.setattr(user_service, 'generate_password_hash', lambda password: f'hashed:{password}')
+
+
+def test_import_users_skips_duplicates_across_batches_and_existing_rows(app, fast_hashing, monkeypatch):
+    monkeypatch.setitem(app.config, 'USER_IMPORT_BATCH_SIZE', 2)
+    make_user('existing', 'broker', email='taken@example.com')
+    records = [
+        {'username': 'agent1', 'email': 'agent1@example.com', 'password': 'secret1', 'role': 'broker'},
+        {'username': 'agent2', 'email': 'agent2@example.com', 'password': 'secret1', 'role': 'broker'},
+        {'username': 'AGENT1', 'email': 'other@example.com', 'password': 'secret1', 'role': 'broker'},
+        {'username': 'agent3', 'email': 'TAKEN@example.com', 'password': 'secret1', 'role': 'broker'},
+        {'username': 'Existing', 'email': 'new@example.com', 'password': 'secret1', 'role': 'broker'},
+        {'username': 'agent4', 'email': 'Agent2@example.com', 'password': 'secret1', 'role': 'broker'},
+        {'username': 'x', 'email': 'bad', 'password': 'secret1', 'role': 'broker'},
+        {'username': 'agent5', 'email': 'agent5@example.com', 'password': 'secret1', 'role': 'broker'},
+    ]
+
+    created, skipped = import_users(records)
+
+    assert created == 3
+    assert [entry['index'] for entry in skipped] == [2, 3, 4, 5, 6]
+    assert {u.username for u in User.query.filter(User.username.like('agent%'))} == {'agent1', 'agent2', 'agent5'}
+    assert User.query.filter_by(username='agent5').one().password_hash == 'hashed:secret1'
+
+
+def test_import_users_validates_phone_numbers(fast_hashing):
+    created, skipped = import_users([
+        {'username': 'agent1', 'email': 'a1@example.com', 'password': 'secret1', 'role': 'broker',
+         'phone_number': '5551234'},
+        {'username': 'agent2', 'email': 'a2@example.com', 'password': 'secret1', 'role': 'broker',
+         'phone_number': 'call me'},
+    ])
+    assert created == 1
+    assert skipped == [{'index': 1, 'reason': {'phone_number': ['Phone number must contain only digits']}}]
+    assert User.query.filter_by(username='agent1').one().phone_number == '5551234'
+
+
+def test_import_users_rejects_client_supplied_password_hash(fast_hashing):
+    created, skipped = import_users([
+        {'username': 'sneaky', 'email': 's@example.com', 'password': 'secret1', 'role': 'admin', 'password_hash': 'x'}
+    ])
+    assert created == 0
+    assert 'password_hash' in skipped[0]['reason']
@@ -0,0 +1,151 @@
+import threading
+
+import jwt
+import pytest
+from flask import Flask
+
+from app.utils import rate_limit
+from app.utils.rate_limit import MemoryStore, RateLimiter
+
+
+# MemoryStore
+
+def test_memory_store_takes_tokens_and_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_limit, 'monotonic', lambda: now[0])
+    store = MemoryStore()
+
+    assert [store.consume('k', 1.0, 2) for _ in range(2)] == [0.0, 0.0]
+    assert store.consume('k', 1.0, 2) == pytest.approx(1.0)
+    assert store.consume('other', 1.0, 2) == 0.0  # Buckets are per key
+
+    now[0] += 0.5
+    assert store.consume('k', 1.0, 2) == pytest.approx(0.5)
+    now[0] += 0.5
+    assert store.consume('k', 1.0, 2) == 0.0
+
+    now[0] += 60
+    store.refund('k', 1.0, 2)  # Refunds never overfill the bucket
+    assert [store.consume('k', 1.0, 2) for _ in range(3)] == [0.0, 0.0, pytest.approx(1.0)]
+
+
+# RateLimiter
+
+@pytest.fixture
+def limited_app():
+    app = Flask('limited')
+    app.config.update(
+        RATELIMIT_DEFAULT='2/minute',
+        ADMISSION_MAX_IN_FLIGHT=1,
+        ADMISSION_MAX_QUEUED=0,
+        ADMISSION_QUEUE_TIMEOUT=0.05,
+        SECRET_KEY='test-secret-key-that-is-long-enough-for-hs256'
+    )
+    release = threading.Event()
+    entered = threading.Event()
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    @app.route('/slow')
+    def slow():
+        entered.set()
+        release.wait(5)
+        return 'done'
+
+    limiter = RateLimiter(app)
+    yield app, limiter, entered, release
+    release.set()
+
+
+@pytest.fixture
+def holding_slot(limited_app):
+    """Occupy the only admission slot from another client until the test ends."""
+    app, limiter, entered, release = limited_app
+    thread = threading.Thread(
+        target=lambda: app.test_client().get('/slow', environ_base={'REMOTE_ADDR': '10.0.0.9'})
+    )
+    thread.start()
+    assert entered.wait(5)
+
+    def free():
+        release.set()
+        thread.join(5)
+
+    yield free
+    free()
+
+
+def test_exhausted_bucket_returns_429_with_retry_after(limited_app):
+    app, limiter, _, _ = limited_app
+    client = app.test_client()
+
+    assert [client.get('/ping').status_code for _ in range(2)] == [200, 200]
+    response = client.get('/ping')
+
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) == 30
+    assert limiter.counters['limited.default'] == 1
+
+
+def test_unrouted_requests_use_the_default_bucket(limited_app):
+    app, limiter, _, _ = limited_app
+    client = app.test_client()
+
+    assert [client.get('/no-such-page').status_code for _ in range(3)] == [404, 404, 429]
+    assert client.get('/ping').status_code == 429
+
+
+def test_full_queue_sheds_without_spending_a_token(limited_app, holding_slot):
+    app, limiter, _, _ = limited_app
+    client = app.test_client()
+
+    responses = [client.get('/ping') for _ in range(3)]
+
+    assert [r.status_code for r in responses] == [503, 503, 503]
+    assert responses[0].headers['Retry-After'] == '1'
+    assert limiter.counters['shed.queue_full'] == 3
+    assert limiter.stats()['queued'] == 0
+
+
+def test_queued_request_times_out_with_503(limited_app, holding_slot):
+    app, limiter, _, _ = limited_app
+    limiter.max_queued = 1
+    client = app.test_client()
+
+    assert client.get('/ping').status_code == 503
+    assert limiter.counters['shed.timeout'] == 1
+    assert limiter.stats()['queued'] == 0
+
+    # The shed request was refunded, so the client still has its full quota
+    holding_slot()
+    assert [client.get('/ping').status_code for _ in range(3)] == [200, 200, 429]
+
+
+def test_authenticated_requests_are_also_charged_to_their_ip(limited_app):
+    app, limiter, _, _ = limited_app
+    limiter.ip_factor = 1
+    client = app.test_client()
+
+    def get(user_id, address):
+        token = jwt.encode({'user_id': user_id}, app.config['SECRET_KEY'], algorithm='HS256')
+        return client.get('/ping', headers={'Authorization': f'Bearer {token}'},
+                          environ_base={'REMOTE_ADDR': address}).status_code
+
+    assert [get(1, '10.0.0.1'), get(1, '10.0.0.1')] == [200, 200]
+    assert get(2, '10.0.0.1') == 429  # Another account on the same address
+    assert get(1, '10.0.0.2') == 429  # The same account from another address
+    # The IP refusal handed back user 2's token, so its own bucket is still full
+    assert [get(2, '10.0.0.3'), get(2, '10.0.0.3')] == [200, 200]
+
+
+def test_admission_control_has_its_own_switch(limited_app, holding_slot):
+    app, limiter, _, _ = limited_app
+    limiter.enabled = False
+    client = app.test_client()
+
+    assert client.get('/ping').status_code == 503
+
+    limiter.admission_enabled = False
+    assert client.get('/ping').status_code == 200